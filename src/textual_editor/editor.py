@@ -2,15 +2,14 @@ import asyncio
 import fcntl
 import os
 import pty
-import shlex
 import struct
 import termios
-from collections.abc import Callable
-from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
 from typing import Any, cast
 
-from anyio import Event, NamedTemporaryFile, wait_readable
-from pyte import Screen, Stream
+from anyio import Event, NamedTemporaryFile
+from pyte import ByteStream, Screen
 from rich.color import Color, parse_rgb_hex
 from rich.segment import Segment
 from rich.style import Style
@@ -18,7 +17,7 @@ from textual import events
 from textual.geometry import Region
 from textual.strip import Strip
 from textual.widget import Widget
-from wcwidth import wcwidth as _wcwidth
+from wcwidth import wcwidth
 
 KEYS = {
     "left": "\u001b[D",
@@ -38,15 +37,43 @@ KEYS = {
     "ctrl+down": "\u001b[1;5B",
 }
 
-wcwidth: Callable[[str], int] = lru_cache(maxsize=4096)(_wcwidth)
+# SGR mouse report templates: bytes %-formatting builds the report in one C
+# call, with no intermediate str or encode
+_MOUSE_MOVE = b"\x1b[<35;%d;%dM"
+_MOUSE_DOWN = b"\x1b[<0;%d;%dM"
+_MOUSE_UP = b"\x1b[<0;%d;%dm"
+
+# style flag bits packed into one byte per cell
+_BOLD = 1
+_ITALICS = 2
+_UNDERSCORE = 4
+_BLINK = 8
+_STRIKETHROUGH = 16
+_REVERSE = 32
+
+# itemgetters over (fg, bg, flags, char) cell tuples, used to find style-run
+# boundaries with groupby at C level
+_CELL_STYLE = itemgetter(0, 1, 2)
+_CELL_CHAR = itemgetter(3)
+
+_DEFAULT_KEY = ("default", "default", 0)
+
+# memoize wcwidth by codepoint: a dict hit is cheaper than going through
+# lru_cache's wrapper on every cell of every dirty line
+_WCW: dict[int, int] = {}
+# static width table for ASCII, by far the common case: indexing a bytes
+# object bypasses the memo dict entirely
+_ASCII_W = bytes(wcwidth(chr(i)) & 0xFF for i in range(128))
 
 
 class Terminal:
     def __init__(self, ncol: int = 0, nrow: int = 0) -> None:
         self._screen = Screen(ncol, nrow)
-        self._stream = Stream(self._screen)
-        self._cache: dict[int, Strip] = {}
-        self._dirty = set([i for i in range(self._screen.lines)])
+        self._stream = ByteStream(self._screen)
+        self._cache: dict[int, tuple[int, Strip]] = {}
+        # None means "every line is dirty"; the set is materialized on first
+        # use so construction and resize stay O(1)
+        self._dirty: set[int] | None = None
         self.cursor_x = None
         self.cursor_y = None
         self._content = None
@@ -59,43 +86,97 @@ class Terminal:
                 return Strip(segments)
             return Strip([])
 
-        self._dirty.update(self._screen.dirty)
+        dirty = self._dirty
+        if dirty is None:
+            dirty = self._dirty = set(range(self._screen.lines))
+        dirty.update(self._screen.dirty)
         self._screen.dirty.clear()
-        if y in self._dirty:
+        if y in dirty:
             line = self._screen.buffer[y]
+            cursor = self._screen.cursor
+            cursor_x = cursor.x if y == cursor.y else None
+            # pyte marks a line dirty on any write, including ones that leave
+            # it visually unchanged: hash the cell contents plus the cursor
+            # position and skip the rebuild when nothing changed
+            columns = self._screen.columns
+            content_hash = hash((cursor_x, tuple(line[x] for x in range(columns))))
+            cached = self._cache.get(y)
+            if cached is not None and cached[0] == content_hash:
+                dirty.remove(y)
+                return cached[1]
+            # extract the line into parallel arrays: characters, packed style
+            # flags and fg/bg colors, so the coalescing pass below compares
+            # one byte and two strings per cell instead of touching nine
+            # attributes on each pyte Char
+            chars: list[str] = []
+            fgs: list[str] = []
+            bgs: list[str] = []
+            flags = bytearray()
             is_wide_char = False
-            segments = []
-            for x in range(self._screen.columns):
+            for x in range(columns):
                 if is_wide_char:
                     is_wide_char = False
                     continue
-                char = line[x].data
-                assert sum(map(wcwidth, char[1:])) == 0
-                is_wide_char = wcwidth(char[0]) == 2
-                char = line[x]
-                reverse = char.reverse
-                if x == self._screen.cursor.x and y == self._screen.cursor.y:
-                    reverse = not reverse
-                color = get_color(char.fg)
-                bgcolor = get_color(char.bg)
-                segments.append(
-                    Segment(
-                        char.data,
-                        Style(
-                            color=color,
-                            bgcolor=bgcolor,
-                            bold=char.bold,
-                            italic=char.italics,
-                            underline=char.underscore,
-                            blink=char.blink,
-                            strike=char.strikethrough,
-                            reverse=reverse,
-                        ),
+                # Char is a NamedTuple: one unpack replaces nine attribute
+                # lookups
+                (
+                    data,
+                    fg,
+                    bg,
+                    bold,
+                    italics,
+                    underscore,
+                    strikethrough,
+                    reverse,
+                    blink,
+                ) = line[x]
+                cp = ord(data[0])
+                if cp < 128:
+                    w = _ASCII_W[cp]
+                else:
+                    w = _WCW.get(cp)
+                    if w is None:
+                        w = _WCW[cp] = wcwidth(data[0])
+                is_wide_char = w == 2
+                f = 0
+                if bold:
+                    f |= _BOLD
+                if italics:
+                    f |= _ITALICS
+                if underscore:
+                    f |= _UNDERSCORE
+                if blink:
+                    f |= _BLINK
+                if strikethrough:
+                    f |= _STRIKETHROUGH
+                if reverse != (x == cursor_x):
+                    f |= _REVERSE
+                chars.append(data)
+                fgs.append(fg)
+                bgs.append(bg)
+                flags.append(f)
+            n = len(chars)
+            if (
+                flags.count(0) == n
+                and fgs.count("default") == n
+                and bgs.count("default") == n
+            ):
+                # entirely unstyled line (no cursor on it): one Segment
+                segments = [Segment("".join(chars), get_style(_DEFAULT_KEY))]
+            else:
+                # coalesce runs of cells sharing a style into one Segment;
+                # groupby with an itemgetter key finds the run boundaries at C
+                # level, leaving one Segment construction per run in Python
+                segments = [
+                    Segment("".join(map(_CELL_CHAR, run)), get_style(key))
+                    for key, run in groupby(
+                        zip(fgs, bgs, flags, chars), key=_CELL_STYLE
                     )
-                )
-            self._cache[y] = Strip(segments)
-            self._dirty.remove(y)
-        return self._cache.get(y, Strip([]))
+                ]
+            self._cache[y] = (content_hash, Strip(segments))
+            dirty.remove(y)
+        cached = self._cache.get(y)
+        return cached[1] if cached is not None else Strip([])
 
 
 class Editor(Widget, can_focus=True):
@@ -113,6 +194,8 @@ class Editor(Widget, can_focus=True):
         self._suffix = ".txt" if language is None else f".{language}"
         self._content = content
         self._terminal: Terminal | None = None
+        self._out_buf = bytearray()
+        self._flush_scheduled = False
         self._editor_created = Event()
         self._terminal_created = Event()
         self._task = asyncio.create_task(self._run())
@@ -136,7 +219,7 @@ class Editor(Widget, can_focus=True):
     def _open_editor(self, name: str) -> int:
         pid, fd = pty.fork()
         if pid == 0:
-            argv = shlex.split(f"{self._editor} {name}")
+            argv = [cast(str, self._editor), name]
             env = dict(
                 TERM="linux",
                 LC_ALL="en_GB.UTF-8",
@@ -144,6 +227,7 @@ class Editor(Widget, can_focus=True):
                 LINES=str(self._nrow),
             )
             os.execvpe(argv[0], argv, env)
+        os.set_blocking(fd, False)
         return fd
 
     async def _run(self) -> None:
@@ -153,40 +237,101 @@ class Editor(Widget, can_focus=True):
             if self._content:
                 await self.set_text(self._content)
             self._editor_fd = self._open_editor(cast(str, self._tempfile.name))
-            self._editor_file = os.fdopen(self._editor_fd, "w+b", 0)
             self._editor_created.set()
-            data_list = []
+            self._editor_exited = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            loop.add_reader(self._editor_fd, self._on_fd_readable)
             try:
-                while True:
-                    await wait_readable(self._editor_file)
-                    data = self._editor_file.read(65536)
-                    data_list.append(data)
-                    try:
-                        data = (b"".join(data_list)).decode()
-                    except Exception:
-                        continue
-                    data_list.clear()
-                    self._terminal._stream.feed(data)
-                    # rerender lines where cursor moved from/to:
-                    if (
-                        self._terminal._screen.cursor.x != self._terminal.cursor_x
-                        or self._terminal._screen.cursor.y != self._terminal.cursor_y
-                    ):
-                        self._terminal._screen.dirty.add(
-                            self._terminal._screen.cursor.y
-                        )
-                        if self._terminal.cursor_y is not None:
-                            self._terminal._screen.dirty.add(self._terminal.cursor_y)
-                        self._terminal.cursor_x = self._terminal._screen.cursor.x
-                        self._terminal.cursor_y = self._terminal._screen.cursor.y
-                    # rerender dirty lines:
-                    for y in set(self._terminal._screen.dirty):
-                        self.refresh(Region(0, y, self._terminal._screen.columns, 1))
+                await self._editor_exited.wait()
             except BaseException:
-                await self._tempfile.seek(0)
-                content = await self._tempfile.read()
-                self._terminal._content = content.splitlines()
-                self.refresh()
+                pass
+            loop.remove_reader(self._editor_fd)
+            await self._tempfile.seek(0)
+            content = await self._tempfile.read()
+            self._terminal._content = content.splitlines()
+            self.refresh()
+
+    def _on_fd_readable(self) -> None:
+        # drain the fd before feeding pyte: a full-screen redraw arrives as
+        # many small writes, and one batched feed + refresh pass is much
+        # cheaper than one per chunk
+        buf = bytearray()
+        exited = False
+        while True:
+            try:
+                data = os.read(self._editor_fd, 65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                # the PTY master raises EIO when the editor exits
+                exited = True
+                break
+            if not data:
+                exited = True
+                break
+            buf += data
+            if len(data) < 65536:
+                break
+        if buf:
+            self._process_bytes(bytes(buf))
+        if exited:
+            self._editor_exited.set()
+
+    def _send(self, data: bytes) -> None:
+        # buffer outgoing bytes and flush once per event-loop tick, so rapid
+        # input (paste, mouse drag) costs one write syscall per tick instead
+        # of one per event
+        self._out_buf += data
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush_out)
+
+    def _flush_out(self) -> None:
+        self._flush_scheduled = False
+        if not self._out_buf:
+            return
+        try:
+            n = os.write(self._editor_fd, self._out_buf)
+        except BlockingIOError:
+            n = 0
+        del self._out_buf[:n]
+        if self._out_buf:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush_out)
+
+    def _process_bytes(self, data: bytes) -> None:
+        assert self._terminal is not None
+        self._terminal._stream.feed(data)
+        # rerender lines where cursor moved from/to:
+        if (
+            self._terminal._screen.cursor.x != self._terminal.cursor_x
+            or self._terminal._screen.cursor.y != self._terminal.cursor_y
+        ):
+            self._terminal._screen.dirty.add(self._terminal._screen.cursor.y)
+            if self._terminal.cursor_y is not None:
+                self._terminal._screen.dirty.add(self._terminal.cursor_y)
+            self._terminal.cursor_x = self._terminal._screen.cursor.x
+            self._terminal.cursor_y = self._terminal._screen.cursor.y
+        # rerender dirty lines: for more than a few lines one bounding-box
+        # region costs a single compositor pass, while cursor-only updates
+        # keep their cheap per-line refreshes
+        screen = self._terminal._screen
+        dirty = screen.dirty
+        if not dirty:
+            return
+        if self._terminal._dirty is not None:
+            self._terminal._dirty.update(dirty)
+        columns = screen.columns
+        if len(dirty) > 3:
+            y_min = min(dirty)
+            y_max = max(dirty)
+            dirty.clear()
+            self.refresh(Region(0, y_min, columns, y_max - y_min + 1))
+        else:
+            ys = sorted(dirty)
+            dirty.clear()
+            for y in ys:
+                self.refresh(Region(0, y, columns, 1))
 
     async def on_resize(self, event: events.Resize):
         self._ncol = event.size.width
@@ -209,36 +354,74 @@ class Editor(Widget, can_focus=True):
             if char is None:
                 return
 
-            self._editor_file.write(char.encode())
+            self._send(char.encode())
             event.stop()
             return
 
         if isinstance(event, events.MouseMove):
-            char = f"\x1b[<35;{event.x + 1};{event.y + 1}M"
-            self._editor_file.write(char.encode())
+            self._send(_MOUSE_MOVE % (event.x + 1, event.y + 1))
             event.stop()
             return
 
         if isinstance(event, events.MouseDown):
-            char = f"\x1b[<0;{event.x + 1};{event.y + 1}M"
-            self._editor_file.write(char.encode())
+            self._send(_MOUSE_DOWN % (event.x + 1, event.y + 1))
             event.stop()
             return
 
         if isinstance(event, events.MouseUp):
-            char = f"\x1b[<0;{event.x + 1};{event.y + 1}m"
-            self._editor_file.write(char.encode())
+            self._send(_MOUSE_UP % (event.x + 1, event.y + 1))
             event.stop()
             return
 
 
+_STYLE_CACHE: dict[tuple[str, str, int], Style] = {}
+
+
+def get_style(key: tuple[str, str, int]) -> Style:
+    style = _STYLE_CACHE.get(key)
+    if style is None:
+        fg, bg, flags = key
+        style = _STYLE_CACHE[key] = Style(
+            color=get_color(fg),
+            bgcolor=get_color(bg),
+            bold=bool(flags & _BOLD),
+            italic=bool(flags & _ITALICS),
+            underline=bool(flags & _UNDERSCORE),
+            blink=bool(flags & _BLINK),
+            strike=bool(flags & _STRIKETHROUGH),
+            reverse=bool(flags & _REVERSE),
+        )
+    return style
+
+
+_COLOR_CACHE: dict[str, Color | str | None] = {}
+# pyte reuses the same str objects for its palette, so an id-keyed probe
+# resolves repeats with a pointer hash instead of hashing the string; the
+# stored str keeps the id alive, and the identity check guards against reuse
+_COLOR_CACHE_BY_ID: dict[int, tuple[str, Color | str | None]] = {}
+_COLOR_MISS = object()
+_HEX_DIGITS = set("0123456789abcdef")
+
+
 def get_color(color: str) -> Color | str | None:
-    try:
-        return Color.from_triplet(parse_rgb_hex(color))
-    except Exception:
-        match color:
-            case "default":
-                return None
-            case "brown":
-                return "orange4"
-        return color
+    entry = _COLOR_CACHE_BY_ID.get(id(color))
+    if entry is not None and entry[0] is color:
+        return entry[1]
+    result = _COLOR_CACHE.get(color, _COLOR_MISS)
+    if result is not _COLOR_MISS:
+        result = cast("Color | str | None", result)
+        _COLOR_CACHE_BY_ID[id(color)] = (color, result)
+        return result
+    match color:
+        case "default":
+            result = None
+        case "brown":
+            result = "orange4"
+        case _:
+            if len(color) == 6 and all(c in _HEX_DIGITS for c in color):
+                result = Color.from_triplet(parse_rgb_hex(color))
+            else:
+                result = color
+    _COLOR_CACHE[color] = result
+    _COLOR_CACHE_BY_ID[id(color)] = (color, result)
+    return result